@@ -7,22 +7,40 @@ from datetime import datetime, timedelta
 import json
 import traceback
 import os
+import secrets
+import threading
+import time
+import dedup
 
 app = Flask(__name__)
 # NOTE: LIC_STR is assumed to be an empty string unless a real SecuGen license is used.
 LIC_STR = '' 
 app.secret_key = 'your_secret_key_change_in_production'
 
-# Data storage for biometric workflows
+# Data storage for biometric workflows, keyed by a per-booth id kept in the
+# booth's session so concurrent booths never see each other's scans.
+# Scans (base64 BMPs) are too large for the session cookie itself.
+# Each entry is (last_used, data); abandoned workflows are evicted after
+# SCAN_DATA_TTL_SECONDS and each store holds at most SCAN_DATA_MAX_ENTRIES.
 registration_data = {}
 login_scan_data = {}
 voting_data = {}
+scan_data_lock = threading.Lock()
+SCAN_DATA_TTL_SECONDS = 10 * 60
+SCAN_DATA_MAX_ENTRIES = 500
 
 # CSV file paths
 VOTERS_CSV = 'voters.csv'
 VOTES_CSV = 'votes.csv'
 CANDIDATES_CSV = 'candidates.csv'
 DAILY_VOTES_CSV = 'daily_votes.csv'
+DEDUP_CHECKPOINT = 'dedup_checkpoint.json'
+
+# Biometric deduplication job (one at a time, started from the admin panel).
+# Its lock, status and stop files sit next to DEDUP_CHECKPOINT so every
+# worker process sees the same job.
+# DEDUP_MATCHER selects the matcher as 'module:ClassName'; the default is a local stand-in
+DEDUP_MATCHER = os.environ.get('DEDUP_MATCHER', dedup.DEFAULT_MATCHER)
 
 
 # HARDCODED TEST VOTE CONSTANTS 
@@ -88,6 +106,31 @@ def TranslateErrorNumber(ErrorNumber):
         case _:
             return "Unknown error code or Update code to reflect latest result"
 
+# Get this booth's entry in one of the scan data stores
+def booth_scan_data(store):
+    booth_id = session.get('booth_id')
+    if not booth_id:
+        booth_id = session['booth_id'] = secrets.token_hex(16)
+    now = time.monotonic()
+    with scan_data_lock:
+        # Re-insert so the store stays ordered from least to most recently used
+        entry = store.pop(booth_id, None)
+        data = entry[1] if entry else {}
+        store[booth_id] = (now, data)
+        while store:
+            oldest_id, (last_used, _) = next(iter(store.items()))
+            if now - last_used <= SCAN_DATA_TTL_SECONDS and len(store) <= SCAN_DATA_MAX_ENTRIES:
+                break
+            del store[oldest_id]
+    return data
+
+# Drop this booth's entry once its workflow no longer needs it
+def clear_booth_scan_data(store):
+    booth_id = session.get('booth_id')
+    if booth_id:
+        with scan_data_lock:
+            store.pop(booth_id, None)
+
 # Helper function to safely convert form values to integers
 def get_int_form_value(form, key, default=0):
     """Safely get integer value from form, handling empty strings and None"""
@@ -326,20 +369,22 @@ def register_scan():
     if ErrorNumber > 0:
         return render_template('error.html', error=ErrorNumber, errordescription=TranslateErrorNumber(ErrorNumber))
     
-    registration_data['template'] = request.form.get('TemplateBase64')
-    registration_data['BMPBase64'] = request.form.get('BMPBase64')
-    registration_data['Manufacturer'] = request.form.get('Manufacturer')
-    registration_data['Model'] = request.form.get('Model')
-    registration_data['SerialNumber'] = request.form.get('SerialNumber')
+    registration = booth_scan_data(registration_data)
+    registration['template'] = request.form.get('TemplateBase64')
+    registration['BMPBase64'] = request.form.get('BMPBase64')
+    registration['Manufacturer'] = request.form.get('Manufacturer')
+    registration['Model'] = request.form.get('Model')
+    registration['SerialNumber'] = request.form.get('SerialNumber')
     
-    return render_template('register_form.html', metadata=registration_data)
+    return render_template('register_form.html', metadata=registration)
 
 @app.route('/save_registration', methods=['POST'])
 def save_registration():
     voter_id = request.form.get('voter_id', '').strip().upper()
     name = request.form.get('name', '').strip()
-    template_base64 = registration_data.get('template', '')
-    bmp_base64 = registration_data.get('BMPBase64', '')
+    registration = booth_scan_data(registration_data)
+    template_base64 = registration.get('template', '')
+    bmp_base64 = registration.get('BMPBase64', '')
     
     if not voter_id or not name or not template_base64:
         return render_template('error.html', error=400, errordescription="Missing required information")
@@ -354,6 +399,7 @@ def save_registration():
     
     # Save voter
     save_voter(voter_id, name, template_base64, bmp_base64)
+    clear_booth_scan_data(registration_data)
     
     return render_template('registration_success.html', voter_id=voter_id, name=name)
 
@@ -377,10 +423,11 @@ def login_scan1():
     if ErrorNumber > 0:
         return render_template('error.html', error=ErrorNumber, errordescription=TranslateErrorNumber(ErrorNumber))
     
-    login_scan_data['template1'] = request.form.get('TemplateBase64', '').strip()
-    login_scan_data['BMPBase64_1'] = request.form.get('BMPBase64', '').strip()
+    login_scan = booth_scan_data(login_scan_data)
+    login_scan['template1'] = request.form.get('TemplateBase64', '').strip()
+    login_scan['BMPBase64_1'] = request.form.get('BMPBase64', '').strip()
     
-    if not login_scan_data['template1']:
+    if not login_scan['template1']:
         return render_template('error.html', error=400, errordescription="Fingerprint template not captured. Please try again.")
     
     input_data = {
@@ -390,7 +437,7 @@ def login_scan1():
         'TemplateFormat': 'ISO',
         'ImageWSQRate': '0.75'
     }
-    return render_template('login_scan2.html', user_input=input_data, metadata1={'BMPBase64': login_scan_data['BMPBase64_1']})
+    return render_template('login_scan2.html', user_input=input_data, metadata1={'BMPBase64': login_scan['BMPBase64_1']})
 
 @app.route('/login_scan2', methods=['POST'])
 def login_scan2():
@@ -398,22 +445,24 @@ def login_scan2():
     if ErrorNumber > 0:
         return render_template('error.html', error=ErrorNumber, errordescription=TranslateErrorNumber(ErrorNumber))
     
-    login_scan_data['template2'] = request.form.get('TemplateBase64', '').strip()
-    login_scan_data['BMPBase64_2'] = request.form.get('BMPBase64', '').strip()
+    login_scan = booth_scan_data(login_scan_data)
+    login_scan['template2'] = request.form.get('TemplateBase64', '').strip()
+    login_scan['BMPBase64_2'] = request.form.get('BMPBase64', '').strip()
     
     # Validate templates exist
-    if not login_scan_data.get('template1') or not login_scan_data.get('template2'):
+    if not login_scan.get('template1') or not login_scan.get('template2'):
         return render_template('error.html', error=400, errordescription="Fingerprint templates missing. Please start login process again.")
     
     # Ensure templates are passed correctly
-    template1 = login_scan_data.get('template1', '')
-    template2 = login_scan_data.get('template2', '')
+    template1 = login_scan.get('template1', '')
+    template2 = login_scan.get('template2', '')
+    clear_booth_scan_data(login_scan_data)
     
     return render_template('login_compare.html', 
                             template1=template1,
                             template2=template2,
-                            metadata1={'BMPBase64': login_scan_data.get('BMPBase64_1', '')},
-                            metadata2={'BMPBase64': login_scan_data.get('BMPBase64_2', '')},
+                            metadata1={'BMPBase64': login_scan.get('BMPBase64_1', '')},
+                            metadata2={'BMPBase64': login_scan.get('BMPBase64_2', '')},
                             user_input={'TemplateFormat': 'ISO', 'SecuGen_Lic': LIC_STR})
 
 @app.route('/login_verify', methods=['POST'])
@@ -646,6 +695,57 @@ def admin_delete_candidates():
     else:
         return jsonify({'error': message}), 500
 
+@app.route('/admin/dedup/start', methods=['POST'])
+def admin_dedup_start():
+    """
+    Starts (or resumes) the N:N biometric deduplication job over all registered
+    voters. Progress is saved to DEDUP_CHECKPOINT, so a stopped job picks up
+    where it left off as long as the voter gallery has not changed.
+    """
+    if not session.get('admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if dedup.is_job_running(DEDUP_CHECKPOINT):
+        return jsonify({'error': 'Deduplication job is already running'}), 409
+    
+    data = request.get_json(silent=True) or request.form
+    threshold = get_int_form_value(data, 'threshold', None)
+    block_size = get_int_form_value(data, 'block_size', dedup.DEFAULT_BLOCK_SIZE)
+    workers = get_int_form_value(data, 'workers', 0) or None
+    
+    if threshold is not None and not 1 <= threshold <= dedup.MAX_SCORE:
+        return jsonify({'error': f'Score threshold must be between 1 and {dedup.MAX_SCORE}'}), 400
+    
+    try:
+        voters = get_all_voters()
+        job = dedup.DedupJob(voters, DEDUP_CHECKPOINT, matcher_spec=DEDUP_MATCHER,
+                             threshold=threshold, block_size=block_size, workers=workers)
+        job.start()
+        return jsonify({'success': True, 'status': job.status()})
+    except dedup.DedupAlreadyRunning as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        print(f"Error starting dedup job: {e}")
+        traceback.print_exc()
+        return jsonify({'error': f"Failed to start deduplication: {str(e)}"}), 500
+
+@app.route('/admin/dedup/stop', methods=['POST'])
+def admin_dedup_stop():
+    if not session.get('admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not dedup.request_stop(DEDUP_CHECKPOINT):
+        return jsonify({'error': 'No deduplication job is running'}), 409
+    
+    return jsonify({'success': True, 'message': 'Stopping after in-flight tiles; progress is checkpointed'})
+
+@app.route('/admin/dedup/status', methods=['GET'])
+def admin_dedup_status():
+    if not session.get('admin'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify(dedup.read_status(DEDUP_CHECKPOINT))
+
 @app.route('/get_voters_json', methods=['GET'])
 def get_voters_json():
     """API endpoint for frontend to get all voters for biometric comparison"""
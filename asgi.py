@@ -0,0 +1,96 @@
+"""
+Async serving mode for the voting app.
+
+Under gunicorn's sync workers each worker is tied up for the whole time a
+booth takes to upload its base64 template/BMP form post, so a handful of slow
+connections stall every other request. This module exposes the same Flask app
+as an ASGI application instead: request bodies are received on the asyncio
+event loop, and only once a body is complete does the (synchronous) Flask view
+run, together with its CSV file I/O, on a bounded thread pool.
+
+Run with uvicorn, as a single process:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Per-booth scan data is kept in memory in this process (see app.py), so do not
+run it with several uvicorn workers. The sync deployment (IIS/wfastcgi,
+gunicorn app:app) is unchanged.
+"""
+import asyncio
+import os
+
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from app import app
+
+# Flask views (and their file I/O) run on at most this many threads
+ASYNC_IO_WORKERS = int(os.environ.get('ASYNC_IO_WORKERS', 16))
+# Bodies are buffered in memory before dispatch, so cap them per request
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', 16 * 1024 * 1024))
+
+wsgi_app = WSGIMiddleware(app, workers=ASYNC_IO_WORKERS)
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+async def read_body(scope, receive):
+    """Receive the whole request body; returns None if the client went away."""
+    for name, value in scope.get('headers', []):
+        if name == b'content-length' and value.isdigit() and int(value) > ASYNC_MAX_BODY_BYTES:
+            raise BodyTooLarge()
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        data = message.get('body', b'')
+        size += len(data)
+        if size > ASYNC_MAX_BODY_BYTES:
+            raise BodyTooLarge()
+        chunks.append(data)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, wsgi_app.executor.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    # Buffer the upload here so a slow booth never holds a WSGI thread
+    try:
+        body = await read_body(scope, receive)
+    except BodyTooLarge:
+        await send({'type': 'http.response.start', 'status': 413,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Request body too large'})
+        return
+    if body is None:
+        return
+
+    replayed = False
+
+    async def replay_body():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+
+    await wsgi_app(scope, replay_body, send)
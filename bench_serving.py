@@ -0,0 +1,177 @@
+"""
+Benchmark: gunicorn sync workers vs. the asyncio serving mode (asgi.py).
+
+Simulates booths on slow links: clients arrive spread over a ramp window, and
+each one trickles a large base64 template/BMP form post to /register_scan over
+a few seconds. While they are uploading, a probe keeps requesting
+/get_candidates_json and records its latency. With sync workers every slow
+upload holds a worker, so the probe queues behind them; in async mode uploads
+only hold a coroutine.
+
+Usage:
+    python bench_serving.py --mode both --clients 1000 --upload-seconds 5
+
+Needs gunicorn and uvicorn installed (not required to run the app itself).
+"""
+import argparse
+import asyncio
+import base64
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+HOST = '127.0.0.1'
+
+
+def build_form(body_kb):
+    # Roughly the size of a real BMP capture once base64-encoded
+    payload = base64.b64encode(os.urandom(body_kb * 768)).decode()
+    return urlencode({
+        'ErrorCode': '0',
+        'TemplateBase64': payload[:1024],
+        'BMPBase64': payload,
+        'Manufacturer': 'SecuGen',
+        'Model': 'bench',
+        'SerialNumber': 'bench',
+    }).encode()
+
+
+def start_server(mode, port, sync_workers, io_workers):
+    if mode == 'sync':
+        cmd = [sys.executable, '-m', 'gunicorn', '-k', 'sync', '-w', str(sync_workers),
+               '-b', f'{HOST}:{port}', '--timeout', '120', 'app:app']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', HOST,
+               '--port', str(port), '--log-level', 'warning', '--backlog', '4096']
+    env = dict(os.environ, ASYNC_IO_WORKERS=str(io_workers))
+    return subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_up(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            await request(port, 'GET', '/', b'', timeout=2)
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def request(port, method, path, body, upload_seconds=0.0, timeout=60):
+    """Send one request, optionally trickling the body; returns the status code."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), timeout)
+    try:
+        head = (f'{method} {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\nConnection: close\r\n'
+                f'Content-Type: application/x-www-form-urlencoded\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n')
+        writer.write(head.encode())
+        if upload_seconds > 0 and body:
+            steps = 20
+            chunk = -(-len(body) // steps)
+            for i in range(0, len(body), chunk):
+                writer.write(body[i:i + chunk])
+                await writer.drain()
+                await asyncio.sleep(upload_seconds / steps)
+        else:
+            writer.write(body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def slow_client(port, body, upload_seconds, delay, results):
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    try:
+        status = await request(port, 'POST', '/register_scan', body, upload_seconds)
+        results.append((status == 200, time.perf_counter() - start))
+    except Exception:
+        results.append((False, time.perf_counter() - start))
+
+
+async def probe(port, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await request(port, 'GET', '/get_candidates_json', b'', timeout=30)
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            latencies.append(float('inf'))
+        await asyncio.sleep(0.1)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_mode(mode, args):
+    port = args.port + (0 if mode == 'sync' else 1)
+    server = start_server(mode, port, args.sync_workers, args.io_workers)
+    try:
+        await wait_until_up(port)
+        body = build_form(args.body_kb)
+        results, latencies = [], []
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(port, stop, latencies))
+        start = time.perf_counter()
+        await asyncio.gather(*(slow_client(port, body, args.upload_seconds,
+                                           random.uniform(0, args.ramp_seconds), results)
+                               for _ in range(args.clients)))
+        wall = time.perf_counter() - start
+        stop.set()
+        await probe_task
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = [t for success, t in results if success]
+    finite = sorted(l for l in latencies if l != float('inf'))
+    return {
+        'mode': mode,
+        'ok': len(ok),
+        'failed': len(results) - len(ok),
+        'wall': wall,
+        'rps': len(ok) / wall if wall else 0.0,
+        'upload_p50': statistics.median(ok) if ok else float('nan'),
+        'probe_p50': percentile(finite, 0.5),
+        'probe_p95': percentile(finite, 0.95),
+        'probe_failed': len(latencies) - len(finite),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+    parser.add_argument('--clients', type=int, default=200, help='concurrent slow uploads')
+    parser.add_argument('--body-kb', type=int, default=128, help='approximate form post size')
+    parser.add_argument('--upload-seconds', type=float, default=5.0, help='time each client takes to upload')
+    parser.add_argument('--ramp-seconds', type=float, default=10.0, help='window over which clients arrive')
+    parser.add_argument('--sync-workers', type=int, default=4, help='gunicorn sync workers')
+    parser.add_argument('--io-workers', type=int, default=16, help='ASYNC_IO_WORKERS for async mode')
+    parser.add_argument('--port', type=int, default=5600)
+    args = parser.parse_args()
+
+    modes = ['sync', 'async'] if args.mode == 'both' else [args.mode]
+    print(f"{args.clients} clients x {args.body_kb} KB uploads over {args.upload_seconds}s, "
+          f"arriving over {args.ramp_seconds}s")
+    print(f"{'mode':<6} {'ok':>5} {'failed':>6} {'wall s':>7} {'req/s':>7} "
+          f"{'upload p50':>10} {'probe p50':>9} {'probe p95':>9} {'probe fail':>10}")
+    for mode in modes:
+        r = asyncio.run(run_mode(mode, args))
+        print(f"{r['mode']:<6} {r['ok']:>5} {r['failed']:>6} {r['wall']:>7.1f} {r['rps']:>7.1f} "
+              f"{r['upload_p50']:>10.2f} {r['probe_p50']:>9.3f} {r['probe_p95']:>9.3f} {r['probe_failed']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,657 @@
+"""
+N:N biometric deduplication for the voter gallery.
+
+Every registered template is compared against every other template. The
+N x N upper triangle is cut into square tiles of BLOCK_SIZE x BLOCK_SIZE
+voters and the tiles are scored on a process pool. Completed tiles are
+written to a checkpoint file so a stopped or crashed job resumes where it
+left off instead of starting over.
+
+The app may run as several processes (IIS FastCGI instances, gunicorn -w N),
+so the job's state lives in files next to the checkpoint rather than in any
+one process: an OS lock on a lock file allows a single running job, a status
+file is rewritten as it progresses, and a stop file asks it to stop.
+
+This module is kept free of Flask imports so that pool workers (which are
+spawned, not forked, on Windows/IIS) only have to import this file.
+"""
+import base64
+import hashlib
+import heapq
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+DEFAULT_BLOCK_SIZE = 64
+# Same minimum score /login_verify accepts as "this is the voter", so anything
+# login would treat as one person is reported as a suspected duplicate.
+# Matchers that score on a different scale can set their own default_threshold.
+DEFAULT_SCORE_THRESHOLD = 20
+DEFAULT_MATCHER = 'dedup:LocalMinutiaeMatcher'
+CHECKPOINT_INTERVAL = 2.0  # seconds between checkpoint/status writes
+# On Windows, os.replace fails while another process has the target open
+# (e.g. read_status() in an admin poll), so replacing is retried this long.
+REPLACE_RETRY_SECONDS = 2.0
+
+# ProcessPoolExecutor raises ValueError above 61 workers on Windows
+MAX_WORKERS = 61 if sys.platform == 'win32' else None
+
+# SecuGen SGIMatchScore reports scores in the range 0-199
+MAX_SCORE = 199
+
+
+# ========== MATCHERS ==========
+
+# A matcher is any class with:
+#   prepare(template_base64) -> features (or None if unusable)
+#   score(features_a, features_b) -> int in 0..MAX_SCORE
+#   default_threshold (optional) -> score at which a pair is reported
+# and is selected by a "module:ClassName" spec, so a server-side SDK binding
+# can replace the local stand-in without touching the job code.
+
+def load_matcher(spec):
+    module_name, _, attr = spec.partition(':')
+    if not module_name or not attr:
+        raise ValueError(f"Matcher spec must look like 'module:ClassName', got {spec!r}")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr)()
+
+
+# ISO/IEC 19794-2 angle units: 256 steps per full turn
+_ANGLE_STEPS = 256
+_COS = [math.cos(2 * math.pi * i / _ANGLE_STEPS) for i in range(_ANGLE_STEPS)]
+_SIN = [math.sin(2 * math.pi * i / _ANGLE_STEPS) for i in range(_ANGLE_STEPS)]
+
+
+def parse_iso_template(raw):
+    """Return [(x, y, angle), ...] from an ISO 19794-2 FMR record, or None."""
+    if len(raw) < 28 or raw[:4] != b'FMR\x00':
+        return None
+    if raw[22] == 0:
+        # No finger views in the record
+        return None
+    count = raw[27]
+    offset = 28
+    if len(raw) < offset + count * 6:
+        return None
+    minutiae = []
+    for i in range(count):
+        m = raw[offset + i * 6: offset + i * 6 + 6]
+        x = ((m[0] & 0x3F) << 8) | m[1]
+        y = ((m[2] & 0x3F) << 8) | m[3]
+        minutiae.append((x, y, m[4]))
+    return minutiae
+
+
+class LocalMinutiaeMatcher:
+    """
+    Local stand-in for the SecuGen matcher, which only runs in the browser.
+
+    Minutiae from ISO templates are aligned with a Hough vote over
+    (rotation, dx, dy). Each minutia pair votes into its nearest bin, and the
+    top bins are then scored over their 3x3x3 neighbourhood, so jitter near a
+    bin edge does not split one alignment in two. The best few alignments are
+    checked by pairing minutiae one-to-one within a distance/angle tolerance;
+    the score is the share of paired minutiae, scaled to the SecuGen 0-199
+    range. Templates that cannot be parsed only match when they are
+    byte-identical.
+
+    The default threshold trades missed rescans against false clusters. On
+    synthetic ISO rescans of 35 minutiae (8 dropped, 8 spurious, +/-5 px
+    jitter, 10 units of rotation) all 300 true pairs scored 125 or more; with
+    10 dropped, +/-8 px and 16 units of rotation the 5th percentile was 85 and
+    roughly 1 in 300 fell below 60. Unrelated fingers peaked at 39 over 11175
+    pairs (99th percentile 28). 60 keeps a margin on both sides; lower it to catch poorer rescans at the cost of more
+    false clusters for an admin to review. This is not calibrated against
+    SecuGen scores; with a real matcher use its own scale.
+    """
+
+    default_threshold = 60
+
+    max_rotation = 16     # angle units (~22 degrees) of finger rotation tolerated
+    rotation_bin = 4      # angle units per rotation bin
+    translation_bin = 16  # pixels per translation bin
+    top_bins = 8          # strongest bins whose neighbourhoods are summed
+    candidates = 3        # best alignments verified by one-to-one pairing
+    pair_distance = 12    # pixels between paired minutiae after alignment
+    pair_angle = 12       # angle units between paired minutiae after alignment
+
+    def prepare(self, template_base64):
+        try:
+            raw = base64.b64decode(template_base64)
+        except Exception:
+            return None
+        minutiae = parse_iso_template(raw)
+        if not minutiae:
+            return ('raw', hashlib.sha256(raw).digest())
+        # Sorted by angle so score() only visits pairs within max_rotation.
+        # For _pair(), each pair_distance grid cell lists the minutiae in its
+        # 3x3 neighbourhood, so a lookup is a single dict access.
+        by_angle = sorted(minutiae, key=lambda m: m[2])
+        angles = [m[2] for m in by_angle]
+        grid = {}
+        cell = self.pair_distance
+        for j, (x, y, t) in enumerate(minutiae):
+            cx, cy = x // cell, y // cell
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    grid.setdefault((gx, gy), []).append(j)
+        return ('iso', minutiae, by_angle, angles, grid)
+
+    def _angle_ranges(self, angles, at):
+        lo, hi = at - self.max_rotation, at + self.max_rotation
+        if lo < 0:
+            bounds = ((lo + _ANGLE_STEPS, _ANGLE_STEPS), (0, hi + 1))
+        elif hi >= _ANGLE_STEPS:
+            bounds = ((lo, _ANGLE_STEPS), (0, hi + 1 - _ANGLE_STEPS))
+        else:
+            bounds = ((lo, hi + 1),)
+        return [(bisect_left(angles, start), bisect_left(angles, end)) for start, end in bounds]
+
+    def score(self, a, b):
+        if a[0] != b[0]:
+            return 0
+        if a[0] == 'raw':
+            return MAX_SCORE if a[1] == b[1] else 0
+
+        ma, mb, by_angle, angles = a[1], b[1], b[2], b[3]
+        half = _ANGLE_STEPS // 2
+        rotation_bin, translation_bin = self.rotation_bin, self.translation_bin
+        # votes[bin] = [count, sum of rotation, sum of dx, sum of dy]
+        votes = {}
+        for ax, ay, at in ma:
+            for i, j in self._angle_ranges(angles, at):
+                for bx, by, bt in by_angle[i:j]:
+                    signed_d = (bt - at + half) % _ANGLE_STEPS - half
+                    d = signed_d % _ANGLE_STEPS
+                    c, s = _COS[d], _SIN[d]
+                    dx = bx - (ax * c - ay * s)
+                    dy = by - (ax * s + ay * c)
+                    key = (round(signed_d / rotation_bin), round(dx / translation_bin),
+                           round(dy / translation_bin))
+                    v = votes.get(key)
+                    if v is None:
+                        votes[key] = [1, signed_d, dx, dy]
+                    else:
+                        v[0] += 1
+                        v[1] += signed_d
+                        v[2] += dx
+                        v[3] += dy
+        if not votes:
+            return 0
+
+        # Sum each strong bin's neighbourhood to recover votes split by jitter
+        neighbourhoods = []
+        for r0, x0, y0 in heapq.nlargest(self.top_bins, votes, key=lambda k: votes[k][0]):
+            total = [0, 0.0, 0.0, 0.0]
+            for r in (r0 - 1, r0, r0 + 1):
+                for x in (x0 - 1, x0, x0 + 1):
+                    for y in (y0 - 1, y0, y0 + 1):
+                        v = votes.get((r, x, y))
+                        if v is not None:
+                            total[0] += v[0]
+                            total[1] += v[1]
+                            total[2] += v[2]
+                            total[3] += v[3]
+            neighbourhoods.append(total)
+        best = heapq.nlargest(self.candidates, neighbourhoods, key=lambda v: v[0])
+        paired = max(self._pair(ma, b, v[1] / v[0], v[2] / v[0], v[3] / v[0]) for v in best)
+        return min(MAX_SCORE, int(MAX_SCORE * 2 * paired / (len(ma) + len(mb))))
+
+    def _pair(self, ma, b, rotation, dx, dy):
+        """Count minutiae of ma that pair one-to-one with b under a transform."""
+        mb, grid = b[1], b[4]
+        cell = self.pair_distance
+        theta = 2 * math.pi * rotation / _ANGLE_STEPS
+        c, s = math.cos(theta), math.sin(theta)
+        max_dist2 = self.pair_distance * self.pair_distance
+        used = set()
+        paired = 0
+        for ax, ay, at in ma:
+            tx = ax * c - ay * s + dx
+            ty = ax * s + ay * c + dy
+            ta = at + rotation
+            best_j, best_dist2 = None, max_dist2
+            for j in grid.get((int(tx // cell), int(ty // cell)), ()):
+                if j in used:
+                    continue
+                bx, by, bt = mb[j]
+                dist2 = (bx - tx) ** 2 + (by - ty) ** 2
+                if dist2 > best_dist2:
+                    continue
+                da = abs((bt - ta + _ANGLE_STEPS / 2) % _ANGLE_STEPS - _ANGLE_STEPS / 2)
+                if da <= self.pair_angle:
+                    best_j, best_dist2 = j, dist2
+            if best_j is not None:
+                used.add(best_j)
+                paired += 1
+        return paired
+
+
+# ========== POOL WORKERS ==========
+
+_worker_matcher = None
+_worker_features = None
+_worker_threshold = 0
+
+
+def _init_worker(matcher_spec, templates, threshold):
+    # Templates are prepared once per worker, not once per comparison
+    global _worker_matcher, _worker_features, _worker_threshold
+    _worker_matcher = load_matcher(matcher_spec)
+    _worker_features = [_worker_matcher.prepare(t) for t in templates]
+    _worker_threshold = threshold
+
+
+def _score_tile(tile):
+    """Score one tile; returns (tile, comparisons, [(i, j, score), ...])."""
+    row_start, row_end, col_start, col_end = tile
+    features = _worker_features
+    score = _worker_matcher.score
+    threshold = _worker_threshold
+    comparisons = 0
+    hits = []
+    for i in range(row_start, row_end):
+        fi = features[i]
+        # Diagonal tiles only cover the upper triangle
+        for j in range(max(col_start, i + 1), col_end):
+            comparisons += 1
+            fj = features[j]
+            if fi is None or fj is None:
+                continue
+            s = score(fi, fj)
+            if s >= threshold:
+                hits.append((i, j, s))
+    return tile, comparisons, hits
+
+
+# ========== JOB ==========
+
+def build_tiles(n, block_size):
+    tiles = []
+    for row_start in range(0, n, block_size):
+        for col_start in range(row_start, n, block_size):
+            tiles.append((row_start, min(row_start + block_size, n),
+                          col_start, min(col_start + block_size, n)))
+    return tiles
+
+
+def tile_comparisons(tile):
+    row_start, row_end, col_start, col_end = tile
+    if row_start != col_start:
+        return (row_end - row_start) * (col_end - col_start)
+    size = row_end - row_start
+    return size * (size - 1) // 2
+
+
+def gallery_fingerprint(voters):
+    digest = hashlib.sha256()
+    for v in voters:
+        digest.update(v['voter_id'].encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(v['template_base64'].encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def find_clusters(voter_ids, pairs):
+    """Group matched pairs into clusters of voter IDs (union-find)."""
+    parent = {}
+
+    def root(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in pairs:
+        parent[root(i)] = root(j)
+
+    groups = {}
+    for i, j, s in pairs:
+        group = groups.setdefault(root(i), {'members': set(), 'pairs': []})
+        group['members'].update((i, j))
+        group['pairs'].append({'voter_a': voter_ids[i], 'voter_b': voter_ids[j], 'score': s})
+
+    clusters = []
+    for group in groups.values():
+        clusters.append({
+            'voter_ids': sorted(voter_ids[i] for i in group['members']),
+            'max_score': max(p['score'] for p in group['pairs']),
+            'pairs': sorted(group['pairs'], key=lambda p: -p['score']),
+        })
+    clusters.sort(key=lambda c: -c['max_score'])
+    return clusters
+
+
+def load_checkpoint(path, fingerprint, block_size, matcher_spec, threshold):
+    """Return (done_tiles, pairs) from a matching checkpoint, else empty."""
+    if not os.path.exists(path):
+        return set(), []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"WARNING: ignoring unreadable dedup checkpoint {path}: {e}")
+        return set(), []
+    if (data.get('fingerprint') != fingerprint or data.get('block_size') != block_size
+            or data.get('matcher') != matcher_spec or data.get('threshold') != threshold):
+        # Gallery or settings changed since the checkpoint; start over
+        return set(), []
+    done = {tuple(t) for t in data.get('done_tiles', [])}
+    pairs = [tuple(p) for p in data.get('pairs', [])]
+    return done, pairs
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    deadline = time.time() + REPLACE_RETRY_SECONDS
+    while True:
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if time.time() >= deadline:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            time.sleep(0.05)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _lock_path(checkpoint_path):
+    return checkpoint_path + '.lock'
+
+
+def _status_path(checkpoint_path):
+    return checkpoint_path + '.status'
+
+
+def _stop_path(checkpoint_path):
+    return checkpoint_path + '.stop'
+
+
+def _try_lock(f):
+    """Take an exclusive OS lock on an open file without blocking."""
+    try:
+        if sys.platform == 'win32':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if sys.platform == 'win32':
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def is_job_running(checkpoint_path):
+    lock_path = _lock_path(checkpoint_path)
+    if not os.path.exists(lock_path):
+        return False
+    with open(lock_path, 'a+', encoding='utf-8') as f:
+        if not _try_lock(f):
+            return True
+        _unlock(f)
+        return False
+
+
+def read_status(checkpoint_path):
+    """Status of the last job for this checkpoint, from whichever process ran it."""
+    status = _read_json(_status_path(checkpoint_path))
+    if status is None:
+        return {'state': 'idle'}
+    if status.get('state') == 'running' and not is_job_running(checkpoint_path):
+        status['state'] = 'interrupted'
+        status['eta_seconds'] = None
+    return status
+
+
+def request_stop(checkpoint_path):
+    """Ask the running job, in any process, to stop; False if none is running."""
+    if not is_job_running(checkpoint_path):
+        return False
+    with open(_stop_path(checkpoint_path), 'w', encoding='utf-8') as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+class DedupAlreadyRunning(Exception):
+    pass
+
+
+def _acquire_lock(checkpoint_path):
+    """
+    Lock the job's lock file for as long as the returned file stays open.
+    The OS drops the lock if the process dies, so there is no stale lock to
+    take over, and the file itself is never deleted (deleting it would let a
+    second process lock a new file while the first still holds the old one).
+    """
+    f = open(_lock_path(checkpoint_path), 'a+', encoding='utf-8')
+    if not _try_lock(f):
+        f.close()
+        raise DedupAlreadyRunning('A deduplication job is already running')
+    return f
+
+
+def save_checkpoint(path, fingerprint, block_size, matcher_spec, threshold, done, pairs):
+    data = {
+        'fingerprint': fingerprint,
+        'block_size': block_size,
+        'matcher': matcher_spec,
+        'threshold': threshold,
+        'done_tiles': sorted(done),
+        'pairs': pairs,
+    }
+    _write_json(path, data)
+
+
+class DedupJob:
+    """
+    One background deduplication run. start() takes the lock file and
+    returns immediately; progress, throughput and clusters are published to
+    the status file for read_status() in any process.
+    """
+
+    def __init__(self, voters, checkpoint_path, matcher_spec=DEFAULT_MATCHER,
+                 threshold=None, block_size=DEFAULT_BLOCK_SIZE,
+                 workers=None):
+        self.voter_ids = [v['voter_id'] for v in voters]
+        self.templates = [v['template_base64'] for v in voters]
+        self.fingerprint = gallery_fingerprint(voters)
+        self.checkpoint_path = checkpoint_path
+        self.matcher_spec = matcher_spec
+        if threshold is None:
+            threshold = getattr(load_matcher(matcher_spec), 'default_threshold', DEFAULT_SCORE_THRESHOLD)
+        # 0 would report every comparison and grow pairs to N^2/2 entries
+        if not 1 <= threshold <= MAX_SCORE:
+            raise ValueError(f"Score threshold must be between 1 and {MAX_SCORE}, got {threshold}")
+        self.threshold = threshold
+        self.block_size = max(1, block_size)
+        workers = max(1, workers or os.cpu_count() or 1)
+        if MAX_WORKERS is not None:
+            workers = min(workers, MAX_WORKERS)
+        self.workers = workers
+
+        self.tiles = build_tiles(len(self.templates), self.block_size)
+        self.total_comparisons = sum(tile_comparisons(t) for t in self.tiles)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self.state = 'idle'
+        self.error = None
+        self.done_tiles = set()
+        self.pairs = []
+        self.resumed_comparisons = 0
+        self.comparisons_done = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self._lock_file = _acquire_lock(self.checkpoint_path)
+        try:
+            os.remove(_stop_path(self.checkpoint_path))
+        except FileNotFoundError:
+            pass
+        self.state = 'running'
+        self.started_at = time.time()
+        self._publish_status()
+        self._thread = threading.Thread(target=self._run, name='dedup-job', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _stop_requested(self):
+        if not self._stop.is_set() and os.path.exists(_stop_path(self.checkpoint_path)):
+            self._stop.set()
+        return self._stop.is_set()
+
+    def _run(self):
+        try:
+            done, pairs = load_checkpoint(self.checkpoint_path, self.fingerprint,
+                                          self.block_size, self.matcher_spec, self.threshold)
+            with self._lock:
+                self.done_tiles = done
+                self.pairs = pairs
+                self.resumed_comparisons = sum(tile_comparisons(t) for t in done)
+                self.comparisons_done = self.resumed_comparisons
+
+            pending = [t for t in self.tiles if t not in done]
+            if pending:
+                self._score_pending(pending)
+            self._checkpoint()
+
+            with self._lock:
+                self.state = 'stopped' if self._stop.is_set() else 'completed'
+        except Exception as e:
+            print(f"ERROR in dedup job: {e}")
+            traceback.print_exc()
+            with self._lock:
+                self.state = 'failed'
+                self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            try:
+                self._publish_status()
+            finally:
+                try:
+                    os.remove(_stop_path(self.checkpoint_path))
+                except FileNotFoundError:
+                    pass
+                _unlock(self._lock_file)
+                self._lock_file.close()
+
+    def _score_pending(self, pending):
+        last_checkpoint = time.time()
+        # Spawn (the only option on Windows) rather than fork: forked workers
+        # would inherit the job's lock file descriptor and keep it locked, and
+        # forking the multithreaded web server process is unsafe anyway.
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.matcher_spec, self.templates, self.threshold),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            # Keep only a couple of tiles per worker in flight so stop() is prompt
+            queue = iter(pending)
+            in_flight = set()
+            while True:
+                while not self._stop_requested() and len(in_flight) < self.workers * 2:
+                    tile = next(queue, None)
+                    if tile is None:
+                        break
+                    in_flight.add(pool.submit(_score_tile, tile))
+                if not in_flight:
+                    break
+                # Time out regularly so stop requests and status stay current
+                finished, in_flight = wait(in_flight, timeout=CHECKPOINT_INTERVAL,
+                                           return_when=FIRST_COMPLETED)
+                for future in finished:
+                    tile, comparisons, hits = future.result()
+                    with self._lock:
+                        self.done_tiles.add(tile)
+                        self.pairs.extend(hits)
+                        self.comparisons_done += comparisons
+                if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    self._checkpoint()
+                    last_checkpoint = time.time()
+
+    def _checkpoint(self):
+        with self._lock:
+            done = set(self.done_tiles)
+            pairs = list(self.pairs)
+        save_checkpoint(self.checkpoint_path, self.fingerprint, self.block_size,
+                        self.matcher_spec, self.threshold, done, pairs)
+        self._publish_status()
+
+    def _publish_status(self):
+        # Status is informational; only a failed checkpoint write fails the job
+        try:
+            _write_json(_status_path(self.checkpoint_path), self.status())
+        except OSError as e:
+            print(f"WARNING: could not write dedup status: {e}")
+
+    def status(self):
+        with self._lock:
+            comparisons_done = self.comparisons_done
+            scored_now = comparisons_done - self.resumed_comparisons
+            pairs = list(self.pairs)
+            tiles_done = len(self.done_tiles)
+            state = self.state
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        rate = scored_now / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_comparisons - comparisons_done
+        return {
+            'state': state,
+            'error': self.error,
+            'voters': len(self.voter_ids),
+            'matcher': self.matcher_spec,
+            'threshold': self.threshold,
+            'block_size': self.block_size,
+            'workers': self.workers,
+            'tiles_done': tiles_done,
+            'tiles_total': len(self.tiles),
+            'comparisons_done': comparisons_done,
+            'comparisons_total': self.total_comparisons,
+            'resumed_comparisons': self.resumed_comparisons,
+            'percent': round(100.0 * comparisons_done / self.total_comparisons, 2) if self.total_comparisons else 100.0,
+            'elapsed_seconds': round(elapsed, 1),
+            'comparisons_per_second': round(rate, 1),
+            'eta_seconds': round(remaining / rate, 1) if rate > 0 and state == 'running' else None,
+            'clusters': find_clusters(self.voter_ids, pairs),
+        }